@@ -42,8 +42,11 @@ class TodoApp:
             "editor": {"auto_save": True, "font_size": 11, "window_size": [600, 700], "dark_mode": True},
             "wallpaper": {
                 "resolution": [2560, 1440], "update_interval": 1, "todo_width_ratio": 0.3, "font_size": 16,
+                "poll_interval": 2, "use_watchdog": False, "set_wallpaper_delay": 0.5, "panel_scale": 1.0,
                 "use_ai_images": True, "openai_api_key": os.environ.get('OPENAI_API_KEY'),
-                "image_quality": "high", "image_size": "1024x1024",
+                "image_model": "gpt-image-1", "image_quality": "high", "image_size": "1024x1024",
+                "provisional_image_quality": "low", "provisional_window": 30, "ai_cache_max_mb": 500, "ai_retries": 3,
+                "use_semantic_cache": False, "semantic_cache_threshold": 0.92, "output_format": "jpeg",
                 "image_style": "modern digital art with vibrant colors",
                 "ai_image_prompt_template": "Create a visually striking image that represents the following tasks: {tasks}.",
                 "background_color": [20, 20, 30], "text_color": [255, 255, 255], "completed_color": [128, 128, 128],
@@ -71,7 +74,8 @@ class TodoApp:
                     "section_spacing": 48,
                     "max_visible_tasks": 5,
                     "enable_shadows": True,
-                    "enable_gradient_bg": True
+                    "enable_gradient_bg": True,
+                    "gradient_direction": "vertical"
                 }
             },
             "system": {"shortcuts": {"desktop": True, "start_menu": True, "startup": True}}
@@ -189,11 +193,13 @@ You can:
     
     def _install_dependencies(self):
         """Install required Python packages"""
-        packages = ['pystray', 'pillow', 'watchdog', 'openai', 'python-dotenv']
+        # Import names differ from some package names; any Pillow build (e.g. pillow-simd) satisfies PIL
+        packages = {'pystray': 'pystray', 'pillow': 'PIL', 'numpy': 'numpy', 'watchdog': 'watchdog',
+                    'openai': 'openai', 'python-dotenv': 'dotenv'}
         
-        for package in packages:
+        for package, module in packages.items():
             try:
-                __import__(package.replace('-', '_'))
+                __import__(module)
             except ImportError:
                 print(f"Installing {package}...")
                 subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
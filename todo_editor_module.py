@@ -132,9 +132,10 @@ class TodoEditor:
                     ))
                     return
                 
-                ai_image_path = generator.generate_ai_image(tasks)
+                # An explicit request always asks for a new image instead of a cached one
+                ai_image_path = generator.generate_ai_image(tasks, use_cache=False)
                 if ai_image_path:
-                    generator.last_ai_image = ai_image_path
+                    generator.set_ai_image(ai_image_path, tasks)
                     generator.create_wallpaper(tasks)
                     generator.set_wallpaper()
                     self.window.after(0, lambda: self.set_status("AI wallpaper generated!"))
@@ -6,18 +6,30 @@ Enhanced with unified design system
 """
 
 import os
+import re
 import sys
 import time
 import platform
+import shutil
 import subprocess
 import base64
+import hashlib
+import json
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+from itertools import accumulate
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 
 try:
+    import numpy as np
     import watchdog.events
     import watchdog.observers
+    import watchdog.observers.polling
 except ImportError:
     print("Required packages not found. Please run: python todo_app.py setup")
     sys.exit(1)
@@ -27,12 +39,147 @@ try:
 except ImportError:
     OpenAI = None
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
 except ImportError:
     pass
 
+# Date/time placeholders are stripped from AI prompts so identical task lists
+# produce identical prompts; dates are only drawn in the overlay text
+_PROMPT_TIME_RE = re.compile(r'\{(date|time|now)[^}]*\}')
+
+# Only the first tasks are described in the AI prompt
+_PROMPT_TASK_LIMIT = 10
+
+# One todo line: optional "[x]", "[ ]" or "x " marker followed by the task text.
+# [^\S\n] is any Unicode whitespace except the line break, matching str.strip()
+_TODO_RE = re.compile(r'^[^\S\n]*(?:\[(?P<mark>[x ])\]|(?P<done>x) (?=[^\S\n]*\S))?[^\S\n]*(?P<text>[^\n]*?)[^\S\n]*$', re.M)
+
+# Wallpaper encoders: file extension and save options, tuned for fast writes
+_OUTPUT_FORMATS = {
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 90, 'subsampling': 2, 'optimize': False}),
+    'webp': ('webp', {'format': 'WEBP', 'quality': 85, 'method': 4}),
+    'png': ('png', {'format': 'PNG', 'compress_level': 1, 'optimize': False}),
+    # Uncompressed: largest file, but nothing to encode or decode (fastest for Windows SPI)
+    'bmp': ('bmp', {'format': 'BMP'})
+}
+
+# Win32 SystemParametersInfo action and flags for setting the desktop wallpaper
+_SPI_SETDESKWALLPAPER = 0x0014
+_SPIF_UPDATEINIFILE = 0x01
+_SPIF_SENDWININICHANGE = 0x02
+
+# Upper bound on cached word widths and wrapped lines before they are reset
+_MEASURE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=1)
+def _system_font_path():
+    """Find the first usable system font file once per process"""
+    font_paths = {
+        "Windows": ["C:/Windows/Fonts/segoeui.ttf", "C:/Windows/Fonts/arial.ttf"],
+        "Darwin": ["/System/Library/Fonts/Helvetica.ttc", "/Library/Fonts/Arial.ttf"],
+        "Linux": ["/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+                 "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"]
+    }
+    
+    for path in font_paths.get(platform.system(), []):
+        if os.path.exists(path):
+            try:
+                ImageFont.truetype(path, 12)
+                return path
+            except OSError:
+                pass
+    return None
+
+def _draw_rounded_rectangle(draw, coords, radius, fill=None, outline=None, width=1):
+    """Draw a rounded rectangle, natively where Pillow supports it"""
+    if hasattr(draw, 'rounded_rectangle'):
+        draw.rounded_rectangle(coords, radius, fill=fill, outline=outline, width=width)
+        return
+    
+    # Pillow before 8.2 has no native rounded rectangle
+    x1, y1, x2, y2 = coords
+    diameter = radius * 2
+    if fill:
+        draw.rectangle([x1 + radius, y1, x2 - radius, y2], fill=fill)
+        draw.rectangle([x1, y1 + radius, x2, y2 - radius], fill=fill)
+        draw.pieslice([x1, y1, x1 + diameter, y1 + diameter], 180, 270, fill=fill)
+        draw.pieslice([x2 - diameter, y1, x2, y1 + diameter], 270, 360, fill=fill)
+        draw.pieslice([x1, y2 - diameter, x1 + diameter, y2], 90, 180, fill=fill)
+        draw.pieslice([x2 - diameter, y2 - diameter, x2, y2], 0, 90, fill=fill)
+    
+    if outline:
+        draw.arc([x1, y1, x1 + diameter, y1 + diameter], 180, 270, fill=outline, width=width)
+        draw.arc([x2 - diameter, y1, x2, y1 + diameter], 270, 360, fill=outline, width=width)
+        draw.arc([x1, y2 - diameter, x1 + diameter, y2], 90, 180, fill=outline, width=width)
+        draw.arc([x2 - diameter, y2 - diameter, x2, y2], 0, 90, fill=outline, width=width)
+        draw.line([x1 + radius, y1, x2 - radius, y1], fill=outline, width=width)
+        draw.line([x1 + radius, y2, x2 - radius, y2], fill=outline, width=width)
+        draw.line([x1, y1 + radius, x1, y2 - radius], fill=outline, width=width)
+        draw.line([x2, y1 + radius, x2, y2 - radius], fill=outline, width=width)
+
+def _radial_gradient(out, start, end):
+    """Fill out (H, W, 3) with a radial blend from start at the center to end at the corners"""
+    height, width = out.shape[:2]
+    cy, cx = (height - 1) / 2, (width - 1) / 2
+    max_radius = max((cx * cx + cy * cy) ** 0.5, 1.0)
+    y = (np.arange(height) - cy)[:, None]
+    x = (np.arange(width) - cx)[None, :]
+    ratio = (np.sqrt(x * x + y * y) / max_radius)[:, :, None]
+    out[:] = start * (1 - ratio) + end * ratio
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _radial_gradient(out, start, end):
+        height, width = out.shape[0], out.shape[1]
+        cy, cx = (height - 1) / 2, (width - 1) / 2
+        max_radius = max((cx * cx + cy * cy) ** 0.5, 1.0)
+        for y in numba.prange(height):
+            dy = y - cy
+            for x in range(width):
+                dx = x - cx
+                ratio = (dx * dx + dy * dy) ** 0.5 / max_radius
+                for c in range(3):
+                    out[y, x, c] = np.uint8(start[c] * (1 - ratio) + end[c] * ratio)
+
+@lru_cache(maxsize=8)
+def _rounded_mask(width, height, radius):
+    """Rounded rectangle alpha mask, rasterized once per size"""
+    mask = Image.new('L', (width, height), 0)
+    _draw_rounded_rectangle(ImageDraw.Draw(mask), (0, 0, width - 1, height - 1), radius, fill=255)
+    return mask
+
+@lru_cache(maxsize=8)
+def _shadow_mask(width, height, radius, offset, alpha):
+    """Soft drop shadow mask for a rounded box, offset down-right and blurred by offset pixels"""
+    mask = Image.new('L', (width + offset * 4, height + offset * 4), 0)
+    _draw_rounded_rectangle(ImageDraw.Draw(mask), (offset * 2, offset * 2, offset * 2 + width - 1, offset * 2 + height - 1),
+                            radius, fill=alpha)
+    return mask.filter(ImageFilter.GaussianBlur(offset))
+
+@lru_cache(maxsize=16)
+def _load_font(size):
+    """Load the system font at size, cached per process"""
+    path = _system_font_path()
+    return ImageFont.truetype(path, size) if path else ImageFont.load_default()
+
+@lru_cache(maxsize=512)
+def _text_mask(text, size):
+    """Rasterized coverage mask of one line of text, cached per text and font size"""
+    font = _load_font(size)
+    left, top, right, bottom = font.getbbox(text)
+    # Glyphs may overhang the origin, so the mask starts at the ink box when it does
+    left, top = min(0, left), min(0, top)
+    mask = Image.new('L', (max(1, right - left), max(1, bottom - top)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+    return mask, (left, top)
+
 class TodoWallpaperGenerator:
     """Dynamic wallpaper generator with unified design system"""
     
@@ -40,9 +187,24 @@ class TodoWallpaperGenerator:
         self.config = config or {}
         
         self.todo_file = Path("todo.txt")
-        self.wallpaper_file = Path("todo_wallpaper.png")
+        self.poll_interval = self.config.get('poll_interval', 2)
+        self.panel_scale = min(max(float(self.config.get('panel_scale', 1.0)), 0.25), 1.0)
+        self.use_watchdog = self.config.get('use_watchdog', False)
+        self.output_format = str(self.config.get('output_format', 'jpeg')).lower()
+        if self.output_format not in _OUTPUT_FORMATS:
+            print(f"Unknown output format '{self.output_format}', using jpeg")
+            self.output_format = 'jpeg'
+        extension, self.save_options = _OUTPUT_FORMATS[self.output_format]
+        self.wallpaper_file = Path(f"todo_wallpaper.{extension}")
+        self._wallpaper_exists = False
         self.ai_image_file = Path("ai_todo_image.png")
         
+        # Persisted generator state survives restarts
+        self.cache_dir = Path.home() / '.cache' / 'todo_wallpaper'
+        self.state_file = self.cache_dir / 'state.json'
+        self._state = self.load_state()
+        self._last_wallpaper_hash = self._state.get('wallpaper_hash')
+        
         self.resolution = tuple(self.config.get('resolution', [2560, 1440]))
         
         # Load design system from config if available
@@ -57,22 +219,112 @@ class TodoWallpaperGenerator:
             'ai_image_prompt_template',
             "Create a visually striking image that represents the following tasks: {tasks}."
         )
+        self.ai_prompt_template = _PROMPT_TIME_RE.sub('', self.ai_prompt_template)
         self.image_style = self.config.get('image_style', 'modern digital art with vibrant colors')
         self.image_quality = self.config.get('image_quality', 'high')
         self.image_size = self.config.get('image_size', '1024x1024')
-        
-        self.last_content = None
-        self.last_ai_image = None
+        self.ai_retries = self.config.get('ai_retries', 3)
+        self.image_model = self.config.get('image_model', 'gpt-image-1')
+        
+        # Burst edits get a cheaper provisional image, upgraded once edits settle
+        self.provisional_quality = self.config.get('provisional_image_quality', 'low')
+        self.provisional_window = self.config.get('provisional_window', 30)
+        
+        # Content addressed cache of generated images, keyed by prompt
+        self.ai_cache_dir = self.cache_dir / 'ai_images'
+        self.ai_cache_max_bytes = self.config.get('ai_cache_max_mb', 500) * 1024 * 1024
+        
+        # Optional semantic cache reuses images for near-duplicate task lists
+        self.use_semantic_cache = self.config.get('use_semantic_cache', False)
+        self.semantic_cache_model = self.config.get('semantic_cache_model', 'sentence-transformers/all-MiniLM-L6-v2')
+        self.semantic_cache_threshold = self.config.get('semantic_cache_threshold', 0.92)
+        self.semantic_index_file = self.ai_cache_dir / 'semantic_index.npy'
+        self.semantic_keys_file = self.ai_cache_dir / 'semantic_keys.json'
+        self.semantic_index = None
+        self.semantic_keys = []
+        self._embedder = None
+        if self.use_semantic_cache:
+            self.load_semantic_index()
+        
+        # The AI image is restored from the previous run; the overlay is always rendered
+        # once at startup so its date and timestamp are current
+        self._last_subject_key = self._state.get('ai_subject')
+        self.last_hash = None
+        self.last_stat = None
+        self.last_ai_image = self._state.get('ai_image')
+        if self.last_ai_image and not Path(self.last_ai_image).exists():
+            self.last_ai_image = self._last_subject_key = None
+        self._ai_image_digest = None
         self.openai_client = None
+        self._last_ai_request_ts = 0
+        self._upgrade_timer = None
+        self._render_lock = threading.RLock()
+        
+        # Rapid set_wallpaper calls collapse into one desktop update
+        self.set_delay = self.config.get('set_wallpaper_delay', 0.5)
+        self._set_timer = None
+        self._set_lock = threading.Lock()
+        self._wallpaper_setter = None
+        self._dbus = None
+        self._gio_settings = None
+        
+        # AI images are generated off the render path, one request at a time
+        self._ai_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-image')
+        self._ai_future = None
+        self._pending_ai_request = None
+        
+        # Todo panel surface, rebuilt only when the panel size changes
+        self._overlay_img = None
+        self._overlay_draw = None
+        self._overlay_mask = None
+        self._container_mask = None
+        self._overlay_size = None
+        self._word_widths = {}
+        self._wrapped_lines = {}
+        
+        # Render memoization: last full state, the panel without its footer and its static header
+        self._ai_image_version = 0
+        self._last_tasks = None
+        self._last_state_key = None
+        self._panel_key = None
+        self._panel_base = None
+        self._panel_chrome = None
+        self._panel_chrome_key = None
+        self._ai_img_decoded = None
+        self._ai_img_key = None
+        self._ai_variants = {}
+        
+        # Composed wallpaper kept across renders so text updates only touch their region
+        self._background_key = None
+        self._background = None
+        self._canvas = None
         
         if self.use_ai_images and self.openai_api_key:
             try:
-                self.openai_client = OpenAI(api_key=self.openai_api_key)
+                # The client retries connection errors, 429s and 5xx with exponential backoff
+                self.openai_client = OpenAI(api_key=self.openai_api_key, max_retries=self.ai_retries)
                 print("AI image generation enabled")
             except Exception as e:
                 print(f"Failed to initialize OpenAI: {e}")
                 self.use_ai_images = False
     
+    def load_state(self):
+        """Load persisted generator state"""
+        try:
+            return json.loads(self.state_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+    
+    def save_state(self):
+        """Persist generator state atomically"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps(self._state), encoding='utf-8')
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            print(f"Error saving state: {e}")
+    
     def setup_design_system(self):
         """Initialize unified design system"""
         # Grid system
@@ -145,220 +397,553 @@ class TodoWallpaperGenerator:
         self.max_visible_tasks = self.design_config.get('max_visible_tasks', 5)
         self.enable_shadows = self.design_config.get('enable_shadows', True)
         self.enable_gradient_bg = self.design_config.get('enable_gradient_bg', True)
+        self.gradient_direction = self.design_config.get('gradient_direction', 'vertical')
     
     def get_font(self, style='body'):
         """Get system font with fallback based on typography system"""
-        size = self.typography[style]['size']
-        
-        font_paths = {
-            "Windows": ["C:/Windows/Fonts/segoeui.ttf", "C:/Windows/Fonts/arial.ttf"],
-            "Darwin": ["/System/Library/Fonts/Helvetica.ttc", "/Library/Fonts/Arial.ttf"],
-            "Linux": ["/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                     "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"]
-        }
+        return _load_font(self.typography[style]['size'])
+    
+    def draw_text(self, draw, xy, text, fill, style='body'):
+        """Draw a line of text through its cached glyph mask"""
+        mask, (dx, dy) = _text_mask(text, self.typography[style]['size'])
+        draw.bitmap((xy[0] + dx, xy[1] + dy), mask, fill=fill)
+    
+    def _text_width(self, draw, text, font, style):
+        """Measure text advance width, cached per word and font size"""
+        key = (text, self.typography[style]['size'])
+        width = self._word_widths.get(key)
+        if width is None:
+            if len(self._word_widths) >= _MEASURE_CACHE_SIZE:
+                self._word_widths.clear()
+            width = self._word_widths[key] = draw.textlength(text, font=font)
+        return width
+    
+    def wrap_text(self, draw, text, font, style, max_width):
+        """Word wrap text to max_width, reusing the lines of an earlier identical wrap"""
+        key = (text, self.typography[style]['size'], max_width)
+        lines = self._wrapped_lines.get(key)
+        if lines is None:
+            if len(self._wrapped_lines) >= _MEASURE_CACHE_SIZE:
+                self._wrapped_lines.clear()
+            lines = self._wrapped_lines[key] = self._wrap_words(draw, text, font, style, max_width)
+        return lines
+    
+    def _wrap_words(self, draw, text, font, style, max_width):
+        """Word wrap text to max_width using a prefix sum of cached word widths"""
+        words = text.split()
+        space_width = self._text_width(draw, ' ', font, style)
+        prefix = [0, *accumulate(self._text_width(draw, word, font, style) + space_width for word in words)]
         
-        for path in font_paths.get(platform.system(), []):
-            if os.path.exists(path):
-                try:
-                    return ImageFont.truetype(path, size)
-                except:
-                    pass
-        return ImageFont.load_default()
+        # Width of words[start:end] is prefix[end] - prefix[start] minus the trailing space
+        lines = []
+        start = 0
+        for end in range(2, len(words) + 1):
+            if prefix[end] - prefix[start] - space_width > max_width:
+                lines.append(' '.join(words[start:end - 1]))
+                start = end - 1
+        
+        if words:
+            lines.append(' '.join(words[start:]))
+        return lines
+    
+    def _get_overlay_layer(self, size):
+        """Get the reusable todo panel layer and its draw handle"""
+        if self._overlay_size != size:
+            width, height = size
+            # Drawn content blends through the rounded mask, the bare container at the designed opacity
+            self._overlay_mask = np.asarray(_rounded_mask(width, height, self.modules['card']['border_radius']))
+            overlay_alpha = self.colors['overlay_alpha']
+            self._container_mask = self._overlay_mask
+            if overlay_alpha < 1:
+                self._container_mask = np.round(self._overlay_mask * overlay_alpha).astype(np.uint8)
+            
+            # Layer and its draw handle are kept across redraws
+            self._overlay_img = Image.new('RGB', size, self.colors['surface'])
+            self._overlay_draw = ImageDraw.Draw(self._overlay_img, 'RGB')
+            self._overlay_size = size
+            self._panel_key = None
+        return self._overlay_img, self._overlay_draw
+    
+    def panel_mask(self, panel, box):
+        """Blend mask for a box of the panel: opaque where content is drawn, overlay_alpha elsewhere"""
+        x0, y0, x1, y1 = box
+        rounded = self._overlay_mask[y0:y1, x0:x1]
+        if self._container_mask is self._overlay_mask:
+            return rounded
+        
+        # Anything that differs from the bare surface colour is drawn content
+        content = (np.asarray(panel)[y0:y1, x0:x1] != self.colors['surface']).any(axis=2)
+        return np.where(content, rounded, self._container_mask[y0:y1, x0:x1])
     
     def draw_rounded_rectangle(self, draw, coords, radius, fill=None, outline=None, width=1):
         """Draw a rounded rectangle"""
-        x1, y1, x2, y2 = coords
-        diameter = radius * 2
-        
-        # Create mask for rounded corners
-        if fill:
-            draw.rectangle([x1 + radius, y1, x2 - radius, y2], fill=fill)
-            draw.rectangle([x1, y1 + radius, x2, y2 - radius], fill=fill)
-            draw.pieslice([x1, y1, x1 + diameter, y1 + diameter], 180, 270, fill=fill)
-            draw.pieslice([x2 - diameter, y1, x2, y1 + diameter], 270, 360, fill=fill)
-            draw.pieslice([x1, y2 - diameter, x1 + diameter, y2], 90, 180, fill=fill)
-            draw.pieslice([x2 - diameter, y2 - diameter, x2, y2], 0, 90, fill=fill)
-        
-        if outline:
-            draw.arc([x1, y1, x1 + diameter, y1 + diameter], 180, 270, fill=outline, width=width)
-            draw.arc([x2 - diameter, y1, x2, y1 + diameter], 270, 360, fill=outline, width=width)
-            draw.arc([x1, y2 - diameter, x1 + diameter, y2], 90, 180, fill=outline, width=width)
-            draw.arc([x2 - diameter, y2 - diameter, x2, y2], 0, 90, fill=outline, width=width)
-            draw.line([x1 + radius, y1, x2 - radius, y1], fill=outline, width=width)
-            draw.line([x1 + radius, y2, x2 - radius, y2], fill=outline, width=width)
-            draw.line([x1, y1 + radius, x1, y2 - radius], fill=outline, width=width)
-            draw.line([x2, y1 + radius, x2, y2 - radius], fill=outline, width=width)
+        _draw_rounded_rectangle(draw, coords, radius, fill, outline, width)
     
     def create_soft_gradient(self, size, start_color, end_color, direction='vertical'):
         """Create a soft gradient background"""
         width, height = size
-        gradient = Image.new('RGB', (width, height))
-        draw = ImageDraw.Draw(gradient)
-        
-        for i in range(height if direction == 'vertical' else width):
-            ratio = i / (height if direction == 'vertical' else width)
-            r = int(start_color[0] * (1 - ratio) + end_color[0] * ratio)
-            g = int(start_color[1] * (1 - ratio) + end_color[1] * ratio)
-            b = int(start_color[2] * (1 - ratio) + end_color[2] * ratio)
-            
-            if direction == 'vertical':
-                draw.line([(0, i), (width, i)], fill=(r, g, b))
-            else:
-                draw.line([(i, 0), (i, height)], fill=(r, g, b))
+        if direction == 'radial':
+            # Per pixel distances, JIT compiled with numba when it is installed
+            pixels = np.empty((height, width, 3), dtype=np.uint8)
+            _radial_gradient(pixels, np.asarray(start_color[:3], dtype=np.float64),
+                             np.asarray(end_color[:3], dtype=np.float64))
+            return Image.fromarray(pixels, 'RGB')
+        
+        steps = height if direction == 'vertical' else width
+        
+        # One color per row (or column), then broadcast across the other axis
+        ratio = (np.arange(steps) / steps)[:, None]
+        ramp = (np.asarray(start_color[:3]) * (1 - ratio) + np.asarray(end_color[:3]) * ratio).astype(np.uint8)
+        if direction == 'vertical':
+            pixels = np.broadcast_to(ramp[:, None, :], (height, width, 3))
+        else:
+            pixels = np.broadcast_to(ramp[None, :, :], (height, width, 3))
         
-        return gradient
+        return Image.fromarray(np.ascontiguousarray(pixels), 'RGB')
     
-    def parse_todo_file(self):
-        """Parse todo file and return list of tasks"""
-        tasks = []
-        if self.todo_file.exists():
+    def read_todo_data(self, size):
+        """Read up to size bytes of the todo file in one call"""
+        # A private copy, the editor may truncate and rewrite the file at any moment
+        if not size:
+            return b''
+        with open(self.todo_file, 'rb') as f:
+            return f.read(size)
+    
+    def parse_todo_file(self, data=None):
+        """Parse todo file (or its already read bytes) and return list of tasks"""
+        if data is None:
             try:
-                with open(self.todo_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        if line.startswith('[x]'):
-                            tasks.append({'text': line[3:].strip(), 'completed': True})
-                        elif line.startswith('[ ]'):
-                            tasks.append({'text': line[3:].strip(), 'completed': False})
-                        elif line.startswith('x '):
-                            tasks.append({'text': line[2:].strip(), 'completed': True})
-                        else:
-                            tasks.append({'text': line, 'completed': False})
+                data = self.read_todo_data(os.stat(self.todo_file).st_size)
+            except FileNotFoundError:
+                return []
             except Exception as e:
                 print(f"Error reading todo file: {e}")
+                return []
+        
+        # Decode once and normalise \r\n and \r line endings like universal newlines, then scan once
+        content = str(data, 'utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+        tasks = []
+        for match in _TODO_RE.finditer(content):
+            text = match.group('text')
+            if text:
+                tasks.append({
+                    'text': text,
+                    'completed': match.group('mark') == 'x' or match.group('done') is not None
+                })
         return tasks
     
-    def generate_ai_image(self, tasks):
-        """Generate AI image based on tasks using gpt-image-1"""
+    def generate_ai_image(self, tasks, quality=None, use_cache=True):
+        """Generate AI image based on tasks using the configured image model, use_cache=False forces a new one"""
         if not self.openai_client or not tasks:
             return None
         
+        provisional = quality is None and self._note_ai_request()
+        
         task_desc = "\n".join(
             f"{t['text']} ({'completed' if t['completed'] else 'pending'})"
-            for t in tasks[:10]
+            for t in tasks[:_PROMPT_TASK_LIMIT]
         )
         
         prompt = self.ai_prompt_template.format(tasks=task_desc)
         if self.image_style:
             prompt += f"\n\nStyle: {self.image_style}"
         
-        print(f"Generating AI image...")
+        # Identical prompts reuse the cached image instead of calling the API, a full quality one first
+        target_quality = quality or self.image_quality
+        cache_key = self._ai_cache_key(prompt, target_quality)
+        cached_file = self.ai_cache_dir / f"{cache_key}.png"
+        if use_cache and self._use_cached_ai_image(cached_file, "Using cached AI image"):
+            return str(self.ai_image_file)
+        
+        # Only a miss falls back to the cheaper provisional quality while the user is editing
+        if quality is None:
+            quality = self._select_image_quality(provisional)
+            if quality != target_quality:
+                cache_key = self._ai_cache_key(prompt, quality)
+                cached_file = self.ai_cache_dir / f"{cache_key}.png"
+                if use_cache and self._use_cached_ai_image(cached_file, "Using cached AI image"):
+                    return str(self.ai_image_file)
+        
+        embedding = None
+        if self.use_semantic_cache and use_cache:
+            embedding, similar_file = self._semantic_lookup(task_desc)
+            if similar_file and self._use_cached_ai_image(similar_file, "Using similar cached AI image"):
+                return str(self.ai_image_file)
+        
+        print(f"Generating AI image ({quality} quality)...")
         
         try:
-            response = self.openai_client.images.generate(
-                model="gpt-image-1",
-                prompt=prompt,
-                size=self.image_size,
-                quality=self.image_quality,
-                n=1
-            )
+            request = {'model': self.image_model, 'prompt': prompt, 'size': self.image_size,
+                       'quality': quality, 'n': 1}
+            # gpt-image models always return base64, DALL-E can return a URL to stream
+            if self.image_model.startswith('dall-e'):
+                request['response_format'] = 'url'
+            image = self.openai_client.images.generate(**request).data[0]
             
-            image_data = base64.b64decode(response.data[0].b64_json)
-            with open(self.ai_image_file, 'wb') as f:
-                f.write(image_data)
+            if getattr(image, 'b64_json', None):
+                changed = self._save_ai_image([base64.b64decode(image.b64_json)])
+            else:
+                changed = self._download_ai_image(image.url)
             
             print("AI image generated successfully")
+            self._store_cached_ai_image(cached_file)
+            if embedding is not None and quality == self.image_quality:
+                self._add_semantic_entry(embedding, cache_key)
+            if changed:
+                self._ai_image_version += 1
             return str(self.ai_image_file)
             
         except Exception as e:
             print(f"Error generating AI image: {e}")
             return None
     
+    def _download_ai_image(self, url):
+        """Stream the image at url to disk, retrying transient failures with exponential backoff"""
+        for attempt in range(self.ai_retries + 1):
+            try:
+                with urllib.request.urlopen(url, timeout=60) as download:
+                    return self._save_ai_image(iter(lambda: download.read(64 * 1024), b''))
+            except OSError as e:
+                if attempt == self.ai_retries:
+                    raise
+                delay = 2 ** attempt
+                print(f"Image download failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+    
+    def load_semantic_index(self):
+        """Load the persisted semantic cache index, dropping it if it does not match the model"""
+        try:
+            semantic_index = np.load(self.semantic_index_file)
+            meta = json.loads(self.semantic_keys_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.semantic_index, self.semantic_keys = None, []
+            return
+        
+        # An index built by another model (or an older keys format) cannot be compared against
+        valid = (isinstance(meta, dict) and meta.get('model') == self.semantic_cache_model
+                 and semantic_index.ndim == 2 and semantic_index.shape[1] == meta.get('dimension')
+                 and len(semantic_index) == len(meta.get('keys', [])))
+        if valid:
+            self.semantic_index, self.semantic_keys = semantic_index, meta['keys']
+        else:
+            self.semantic_index, self.semantic_keys = None, []
+    
+    def _semantic_lookup(self, text):
+        """Embed text and return (embedding, cached image path or None)"""
+        try:
+            if self._embedder is None:
+                from sentence_transformers import SentenceTransformer
+                self._embedder = SentenceTransformer(self.semantic_cache_model, device='cpu')
+            embedding = self._embedder.encode(text, normalize_embeddings=True).astype(np.float32)
+        except Exception as e:
+            print(f"Semantic cache disabled: {e}")
+            self.use_semantic_cache = False
+            return None, None
+        
+        if self.semantic_index is not None and self.semantic_index.shape[1] != embedding.shape[0]:
+            print("Semantic cache index does not match the embedding model, rebuilding it")
+            self.semantic_index, self.semantic_keys = None, []
+        
+        if self.semantic_index is None or not len(self.semantic_index):
+            return embedding, None
+        
+        # Embeddings are normalized, so the dot product is the cosine similarity
+        scores = self.semantic_index @ embedding
+        best = int(np.argmax(scores))
+        cached_file = self.ai_cache_dir / f"{self.semantic_keys[best]}.png"
+        if scores[best] >= self.semantic_cache_threshold and cached_file.exists():
+            return embedding, cached_file
+        return embedding, None
+    
+    def _add_semantic_entry(self, embedding, cache_key):
+        """Append an embedding to the semantic index and persist it atomically"""
+        if self.semantic_index is None:
+            self.semantic_index = embedding[None, :]
+        else:
+            self.semantic_index = np.vstack([self.semantic_index, embedding])
+        self.semantic_keys.append(cache_key)
+        
+        try:
+            tmp_index = self.semantic_index_file.with_suffix('.tmp')
+            with open(tmp_index, 'wb') as f:
+                np.save(f, self.semantic_index)
+            os.replace(tmp_index, self.semantic_index_file)
+            
+            tmp_keys = self.semantic_keys_file.with_suffix('.tmp')
+            meta = {'model': self.semantic_cache_model, 'dimension': self.semantic_index.shape[1],
+                    'keys': self.semantic_keys}
+            tmp_keys.write_text(json.dumps(meta), encoding='utf-8')
+            os.replace(tmp_keys, self.semantic_keys_file)
+        except OSError as e:
+            print(f"Error saving semantic cache: {e}")
+    
+    def _save_ai_image(self, chunks):
+        """Stream image bytes to the AI image file, returns False if the content is unchanged"""
+        digest = hashlib.sha256()
+        tmp_file = self.ai_image_file.with_suffix('.tmp')
+        with open(tmp_file, 'wb') as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+        
+        digest = digest.hexdigest()
+        if digest == self._ai_image_digest and self.ai_image_file.exists():
+            os.remove(tmp_file)
+            return False
+        os.replace(tmp_file, self.ai_image_file)
+        self._ai_image_digest = digest
+        return True
+    
+    def _ai_cache_key(self, prompt, quality):
+        """Cache key of the image rendered for prompt at quality"""
+        return hashlib.sha256((prompt + self.image_size + quality).encode('utf-8')).hexdigest()
+    
+    def _use_cached_ai_image(self, cached_file, message):
+        """Swap a cached image in as the AI image, returns False if it is missing or unreadable"""
+        if not cached_file.exists():
+            return False
+        try:
+            # Copied through the temporary file so a concurrent render never reads a partial image
+            with open(cached_file, 'rb') as f:
+                changed = self._save_ai_image(iter(lambda: f.read(64 * 1024), b''))
+            os.utime(cached_file)
+        except OSError as e:
+            print(f"Error reading cached AI image: {e}")
+            return False
+        
+        print(message)
+        if changed:
+            self._ai_image_version += 1
+        return True
+    
+    def _store_cached_ai_image(self, cached_file):
+        """Add the current AI image to the cache and evict least recently used entries"""
+        try:
+            self.ai_cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.ai_image_file, cached_file)
+            
+            entries = [(path.stat(), path) for path in self.ai_cache_dir.glob('*.png')]
+            total_size = sum(st.st_size for st, _ in entries)
+            for st, path in sorted(entries, key=lambda entry: entry[0].st_mtime):
+                if total_size <= self.ai_cache_max_bytes:
+                    break
+                path.unlink()
+                total_size -= st.st_size
+        except OSError as e:
+            print(f"Error updating AI image cache: {e}")
+    
+    def _note_ai_request(self):
+        """Record an AI image request and cancel any pending upgrade, returns whether edits are frequent"""
+        now = time.time()
+        provisional = now - self._last_ai_request_ts < self.provisional_window
+        self._last_ai_request_ts = now
+        
+        if self._upgrade_timer:
+            self._upgrade_timer.cancel()
+            self._upgrade_timer = None
+        return provisional
+    
+    def _select_image_quality(self, provisional):
+        """Pick the image quality for a request that missed the cache based on edit frequency"""
+        if not provisional or self.provisional_quality == self.image_quality:
+            return self.image_quality
+        
+        # Re-render at full quality once the user stops editing
+        self._upgrade_timer = threading.Timer(self.provisional_window, self._upgrade_ai_image)
+        self._upgrade_timer.daemon = True
+        self._upgrade_timer.start()
+        return self.provisional_quality
+    
+    def _upgrade_ai_image(self):
+        """Replace a provisional AI image with a full quality render"""
+        self._upgrade_timer = None
+        self.request_ai_image(self.parse_todo_file(), quality=self.image_quality)
+    
+    def task_fingerprint(self, tasks):
+        """Fingerprint the parsed tasks, including completion, for render memoization"""
+        return hashlib.blake2b(json.dumps(tasks, sort_keys=True).encode('utf-8'), digest_size=16).digest()
+    
+    def subject_key(self, tasks):
+        """Fingerprint the set of task texts an AI prompt depicts, ignoring completion and spacing"""
+        texts = {' '.join(t['text'].split()) for t in tasks[:_PROMPT_TASK_LIMIT]}
+        return hashlib.sha256('\n'.join(sorted(texts)).encode('utf-8')).hexdigest()
+    
+    def set_ai_image(self, ai_path, tasks):
+        """Use ai_path as the current AI image for tasks"""
+        self.last_ai_image = ai_path
+        self._last_subject_key = self.subject_key(tasks)
+        self._state.update({'ai_image': ai_path, 'ai_subject': self._last_subject_key})
+        self.save_state()
+    
+    def request_ai_image(self, tasks, quality=None):
+        """Generate the AI image in the background, coalescing requests made while one is in flight"""
+        with self._render_lock:
+            self._pending_ai_request = (tasks, quality)
+            if self._ai_future and not self._ai_future.done():
+                return
+            self._pending_ai_request = None
+            self._ai_future = self._ai_pool.submit(self.generate_ai_image, tasks, quality)
+            self._ai_future.add_done_callback(lambda future: self._on_ai_image_ready(future, tasks))
+    
+    def _on_ai_image_ready(self, future, tasks):
+        """Re-render with a finished AI image and start the newest pending request"""
+        with self._render_lock:
+            ai_path = future.result()
+            if ai_path:
+                self.set_ai_image(ai_path, tasks)
+            
+            pending = self._pending_ai_request
+            if pending:
+                self._pending_ai_request = None
+                self._ai_future = None
+                self.request_ai_image(*pending)
+            elif ai_path:
+                # Tasks may have been edited while the image was generating, render the latest list
+                current_tasks = self._last_tasks if self._last_tasks is not None else tasks
+                if self.create_wallpaper(current_tasks):
+                    self.set_wallpaper()
+    
+    def _decode_ai_image(self, path):
+        """Decode the AI image once per file version"""
+        if self._ai_img_decoded is None:
+            ai_img = Image.open(path)
+            ai_img.load()
+            # Composited through a separate mask, so any alpha channel is dropped up front
+            if ai_img.mode != 'RGB':
+                ai_img = ai_img.convert('RGB')
+            self._ai_img_decoded = ai_img
+        return self._ai_img_decoded
+    
+    def resize_ai_image(self, path, max_dimension):
+        """Load the AI image scaled to fit max_dimension, reusing earlier sizes in memory and on disk"""
+        st = os.stat(path)
+        image_key = (path, st.st_mtime_ns, st.st_size, self._ai_image_version)
+        if image_key != self._ai_img_key:
+            # New source image, drop the decoded copy and sizes of the previous one
+            self._ai_img_key = image_key
+            self._ai_img_decoded = None
+            self._ai_variants = {}
+        if max_dimension in self._ai_variants:
+            return self._ai_variants[max_dimension]
+        
+        # Resized copies persist across restarts, named after the source file version
+        source_id = hashlib.blake2b(repr(image_key[:3]).encode('utf-8'), digest_size=8).hexdigest()
+        resized_file = self.cache_dir / f"ai_resized_{source_id}_{max_dimension}.png"
+        try:
+            ai_img = Image.open(resized_file)
+            ai_img.load()
+            self._ai_variants[max_dimension] = ai_img
+            return ai_img
+        except (OSError, ValueError):
+            pass
+        
+        ai_img = self._decode_ai_image(path)
+        
+        # Fit within a square box, never upscaling beyond the original
+        scale = min(max_dimension / ai_img.width, max_dimension / ai_img.height, 1)
+        target = (max(1, round(ai_img.width * scale)), max(1, round(ai_img.height * scale)))
+        
+        # One integer box reduction first, then a single Lanczos pass to the exact size
+        factor = 1
+        while ai_img.width >= target[0] * factor * 2 and ai_img.height >= target[1] * factor * 2:
+            factor *= 2
+        if factor > 1:
+            ai_img = ai_img.reduce(factor)
+        if ai_img.size != target:
+            ai_img = ai_img.resize(target, Image.Resampling.LANCZOS)
+        
+        self._ai_variants[max_dimension] = ai_img
+        self._save_resized_ai_image(ai_img, resized_file, source_id)
+        return ai_img
+    
+    def _save_resized_ai_image(self, ai_img, resized_file, source_id):
+        """Persist a resized AI image and remove those of older source images"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for stale in self.cache_dir.glob('ai_resized_*.png'):
+                if not stale.name.startswith(f"ai_resized_{source_id}_"):
+                    stale.unlink()
+            tmp_file = resized_file.with_suffix('.tmp')
+            ai_img.save(tmp_file, format='PNG', compress_level=1)
+            os.replace(tmp_file, resized_file)
+        except OSError as e:
+            print(f"Error caching resized AI image: {e}")
+    
     def create_task_module(self, draw, task, x, y, width, completed_count, total_count):
         """Create a single task module with unified design"""
-        module_height = self.modules['card']['min_height']
-        padding = self.modules['card']['padding']
-        radius = self.modules['card']['border_radius']
+        card = self.modules['card']
+        module_height, padding, radius = card['min_height'], card['padding'], card['border_radius']
+        colors = self.colors
+        grid = self.grid_unit
+        headline = self.typography['headline']
         
         # Draw module background with subtle shadow (if enabled)
         if self.enable_shadows:
-            shadow_offset = 4
-            for i in range(shadow_offset):
-                alpha = int(40 * (1 - i/shadow_offset))
-                shadow_color = (*self.colors['shadow'][:3], alpha)
-                self.draw_rounded_rectangle(
-                    draw, 
-                    (x + i, y + i, x + width + i, y + module_height + i), 
-                    radius, 
-                    fill=shadow_color
-                )
+            shadow_offset = max(1, grid // 2)
+            shadow = _shadow_mask(width + 1, module_height + 1, radius, shadow_offset, colors['shadow'][3])
+            draw.bitmap((x - shadow_offset, y - shadow_offset), shadow, fill=colors['shadow'][:3])
         
         # Draw main container
         self.draw_rounded_rectangle(
             draw, 
             (x, y, x + width, y + module_height), 
             radius, 
-            fill=self.colors['overlay']
+            fill=colors['overlay']
         )
         
         # Task status indicator with accent color
-        indicator_size = self.grid_unit * 2
+        indicator_size = grid * 2
         indicator_x = x + padding
-        indicator_y = y + padding + (self.typography['headline']['size'] - indicator_size) // 2
+        indicator_y = y + padding + (headline['size'] - indicator_size) // 2
         
         if task['completed']:
             draw.ellipse(
                 [indicator_x, indicator_y, indicator_x + indicator_size, indicator_y + indicator_size],
-                fill=self.colors['success']
+                fill=colors['success']
             )
             # Checkmark
+            tick = indicator_size / 16
             draw.line(
-                [(indicator_x + 5, indicator_y + 8), (indicator_x + 8, indicator_y + 11), 
-                 (indicator_x + 13, indicator_y + 6)],
-                fill=self.colors['overlay'], width=2
+                [(indicator_x + int(5 * tick), indicator_y + int(8 * tick)),
+                 (indicator_x + int(8 * tick), indicator_y + int(11 * tick)),
+                 (indicator_x + int(13 * tick), indicator_y + int(6 * tick))],
+                fill=colors['overlay'], width=max(1, int(2 * tick))
             )
         else:
             draw.ellipse(
                 [indicator_x, indicator_y, indicator_x + indicator_size, indicator_y + indicator_size],
-                outline=self.colors['accent'], width=2
+                outline=colors['accent'], width=max(1, int(2 * indicator_size / 16))
             )
         
         # Task text with typography hierarchy
-        text_x = indicator_x + indicator_size + self.grid_unit * 2
-        text_width = width - padding * 2 - indicator_size - self.grid_unit * 2
+        text_x = indicator_x + indicator_size + grid * 2
+        text_width = width - padding * 2 - indicator_size - grid * 2
         
         # Task headline
         headline_font = self.get_font('headline')
-        task_color = self.colors['text_disabled'] if task['completed'] else self.colors['text_primary']
+        task_color = colors['text_disabled'] if task['completed'] else colors['text_primary']
         
         # Word wrap text
-        words = task['text'].split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            bbox = draw.textbbox((0, 0), test_line, font=headline_font)
-            if bbox[2] - bbox[0] <= text_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
-        
-        if current_line:
-            lines.append(' '.join(current_line))
+        lines = self.wrap_text(draw, task['text'], headline_font, 'headline', text_width)
         
         # Draw task text (max 2 lines)
         text_y = y + padding
+        line_advance = int(headline['size'] * headline['line_height'])
         for i, line in enumerate(lines[:2]):
             if i == 1 and len(lines) > 2:
                 line = line + "..."
-            draw.text((text_x, text_y), line, fill=task_color, font=headline_font)
-            text_y += int(self.typography['headline']['size'] * self.typography['headline']['line_height'])
+            self.draw_text(draw, (text_x, text_y), line, task_color, 'headline')
+            text_y += line_advance
         
         # Progress indicator at bottom
-        progress_y = y + module_height - padding - self.grid_unit
+        progress_y = y + module_height - padding - grid
         progress_width = width - padding * 2
-        progress_height = self.grid_unit // 2
+        progress_height = grid // 2
         
         # Background bar
         draw.rectangle(
             [x + padding, progress_y, x + padding + progress_width, progress_y + progress_height],
-            fill=self.colors['border']
+            fill=colors['border']
         )
         
         # Progress fill
@@ -367,24 +952,56 @@ class TodoWallpaperGenerator:
             draw.rectangle(
                 [x + padding, progress_y, 
                  x + padding + int(progress_width * progress), progress_y + progress_height],
-                fill=self.colors['accent']
+                fill=colors['accent']
             )
         
-        return module_height + self.grid_unit * 2
+        return module_height + grid * 2
+    
+    def build_render_plan(self, tasks, now=None):
+        """Collect the resolution independent inputs of a render: keys, counts and strings"""
+        now = now or datetime.now()
+        completed_count = sum(1 for t in tasks if t['completed'])
+        return {
+            'tasks': tasks,
+            'tasks_key': self.task_fingerprint(tasks),
+            'subject_key': self.subject_key(tasks),
+            'completed_count': completed_count,
+            'stats_text': f"{completed_count} of {len(tasks)} completed",
+            'date_text': now.strftime("%A, %B %d, %Y"),
+            'footer_text': f"Updated {now.strftime('%H:%M')}",
+            'minute': now.strftime('%Y%m%d%H%M')
+        }
     
     def create_wallpaper(self, tasks):
-        """Create wallpaper with unified design system"""
+        """Create wallpaper with unified design system, returns False if unchanged"""
         width, height = self.resolution
         
-        # Create background (gradient or solid based on config)
-        if self.enable_gradient_bg:
-            img = self.create_soft_gradient(
-                (width, height),
-                self.colors['background'],
-                (self.colors['background'][0] + 10, self.colors['background'][1] + 10, self.colors['background'][2] + 20)
-            )
-        else:
-            img = Image.new('RGB', (width, height), self.colors['background'])
+        self._last_tasks = tasks
+        plan = self.build_render_plan(tasks)
+        
+        # Generate AI image if needed
+        if self.use_ai_images:
+            # Checking off a task keeps the subject, so only new or edited task text needs a new image
+            # A failed request is not retried on every save, only once the subject changes again
+            if plan['subject_key'] != self._last_subject_key:
+                # Render now with the last known AI image, re-render when the new one is ready
+                self._last_subject_key = plan['subject_key']
+                self.request_ai_image(tasks)
+        
+        # The AI image file can be rewritten by another process (the editor), so its stat is part of the keys
+        ai_stat = None
+        if self.use_ai_images and self.last_ai_image:
+            try:
+                st = os.stat(self.last_ai_image)
+                ai_stat = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+        
+        # Output is pixel identical for the same AI image, tasks and minute
+        state_key = (self.use_ai_images, self.last_ai_image, ai_stat, self._ai_image_version,
+                     plan['tasks_key'], plan['minute'])
+        if state_key == self._last_state_key and self.wallpaper_present():
+            return False
         
         # Calculate layout based on grid system
         content_width = width - self.container_padding * 2
@@ -397,114 +1014,197 @@ class TodoWallpaperGenerator:
             image_section_width = 0
             todo_section_width = content_width
         
-        # Generate AI image if needed
+        # Background and AI image only change with the resolution or a new AI image
+        dirty_regions = set()
+        background_key = (self.resolution, self.enable_gradient_bg, self.gradient_direction, self.use_ai_images,
+                          self.last_ai_image, ai_stat, self._ai_image_version)
+        if background_key != self._background_key or self._canvas is None:
+            self._background = np.array(self.create_background((width, height), image_section_width))
+            self._canvas = self._background.copy()
+            self._background_key = background_key
+            dirty_regions.add('background')
+        
+        # Todo section positioning with vertical centering
+        todo_x = self.container_padding + (image_section_width if self.use_ai_images else 0)
+        
+        # Reduce container height and center vertically using config ratio
+        vertical_padding = int(height * self.vertical_padding_ratio)
+        todo_y = vertical_padding
+        container_height = height - (vertical_padding * 2)
+        
+        # Todo panel is drawn on its own reusable layer
+        panel_size = (todo_section_width, container_height)
+        panel, draw = self._get_overlay_layer(panel_size)
+        title_padding = self.modules['card']['padding']
+        body_font = self.get_font('body')
+        
+        # Timestamp is right aligned; the footer band reserves room for any HH:MM plus a grid unit
+        footer_text = plan['footer_text']
+        footer_reserve = self._text_width(draw, "Updated 00:00", body_font, 'body')
+        footer_x = max(0, int(todo_section_width - title_padding - footer_reserve) - self.grid_unit)
+        footer_y = container_height - title_padding - self.typography['body']['size']
+        footer_box = (footer_x, footer_y, todo_section_width, container_height)
+        
+        panel_key = (panel_size, plan['tasks_key'], plan['date_text'])
+        if panel_key == self._panel_key:
+            # Only the footer changed, restore its band from the cached panel
+            panel.paste(self._panel_base.crop(footer_box), footer_box[:2])
+            dirty_regions.add('footer')
+        else:
+            if self.panel_scale < 1:
+                self.draw_scaled_panel(panel, plan)
+            else:
+                panel.paste(self.panel_chrome(panel_size, plan))
+                self.draw_panel(draw, plan, todo_section_width, container_height)
+            self._panel_base = panel.copy()
+            self._panel_key = panel_key
+            dirty_regions.add('panel')
+        
+        # Footer with timestamp
+        self.draw_text(
+            draw,
+            (round(todo_section_width - title_padding - self._text_width(draw, footer_text, body_font, 'body')), footer_y),
+            footer_text,
+            self.colors['text_disabled'],
+            'body'
+        )
+        
+        # Reset the dirty region to the background and blend the panel back over it
+        canvas = self._canvas
+        if dirty_regions & {'background', 'panel'}:
+            region = (todo_x, todo_y, todo_x + todo_section_width, todo_y + container_height)
+            self.restore_region(region)
+            self.blend_layer(canvas, panel, self.panel_mask(panel, (0, 0) + panel_size), (todo_x, todo_y))
+        else:
+            region = (todo_x + footer_x, todo_y + footer_y, todo_x + todo_section_width, todo_y + container_height)
+            self.restore_region(region)
+            self.blend_layer(canvas, panel.crop(footer_box), self.panel_mask(panel, footer_box), region[:2])
+        self._last_state_key = state_key
+        
+        # Skip the write (and the desktop reload) when the pixels are unchanged
+        wallpaper_hash = hashlib.blake2b(canvas, digest_size=16).hexdigest()
+        if wallpaper_hash == self._last_wallpaper_hash and self.wallpaper_present():
+            return False
+        
+        Image.fromarray(canvas).save(self.wallpaper_file, **self.save_options)
+        self._wallpaper_exists = True
+        self._last_wallpaper_hash = wallpaper_hash
+        self._state['wallpaper_hash'] = wallpaper_hash
+        self.save_state()
+        return True
+    
+    def create_background(self, size, image_section_width):
+        """Create the background with the AI image placed in its section"""
+        width, height = size
+        
+        # Create background (gradient or solid based on config)
+        if self.enable_gradient_bg:
+            img = self.create_soft_gradient(
+                (width, height),
+                self.colors['background'],
+                (self.colors['background'][0] + 10, self.colors['background'][1] + 10, self.colors['background'][2] + 20),
+                self.gradient_direction
+            )
+        else:
+            img = Image.new('RGB', (width, height), self.colors['background'])
+        
         if self.use_ai_images:
-            tasks_content = str(tasks)
-            if tasks_content != self.last_content or not self.ai_image_file.exists():
-                ai_path = self.generate_ai_image(tasks)
-                if ai_path:
-                    self.last_ai_image = ai_path
-                self.last_content = tasks_content
-            
             if self.last_ai_image and Path(self.last_ai_image).exists():
                 try:
-                    # Create image container with overlay
-                    ai_img = Image.open(self.last_ai_image)
-                    
                     # AI images from OpenAI are always square (1024x1024), maintain 1:1 aspect ratio
                     # Do not use the config aspect ratio for AI images
                     max_dimension = min(image_section_width - self.gutter, height - self.container_padding * 2)
-                    
-                    # Keep it square
-                    target_size = min(max_dimension, ai_img.width)  # Don't upscale beyond original
-                    
-                    # Resize maintaining square aspect ratio
-                    ai_img.thumbnail((target_size, target_size), Image.Resampling.LANCZOS)
+                    ai_img = self.resize_ai_image(self.last_ai_image, max_dimension)
                     actual_width = ai_img.width
                     actual_height = ai_img.height
                     
-                    # Create overlay for image
-                    overlay = Image.new('RGBA', (actual_width, actual_height), (0, 0, 0, 0))
-                    overlay_draw = ImageDraw.Draw(overlay)
-                    
                     # Add rounded corners to image
-                    mask = Image.new('L', (actual_width, actual_height), 0)
-                    mask_draw = ImageDraw.Draw(mask)
-                    self.draw_rounded_rectangle(
-                        mask_draw,
-                        (0, 0, actual_width, actual_height),
-                        self.modules['image']['border_radius'],
-                        fill=255
-                    )
-                    
-                    # Apply mask
-                    output = Image.new('RGBA', (actual_width, actual_height), (0, 0, 0, 0))
-                    output.paste(ai_img, (0, 0))
-                    output.putalpha(mask)
+                    mask = _rounded_mask(actual_width, actual_height, self.modules['image']['border_radius'])
                     
                     # Center image in its section
                     image_x = self.container_padding + (image_section_width - self.gutter - actual_width) // 2
                     image_y = (height - actual_height) // 2
                     
-                    img.paste(output, (image_x, image_y), output)
+                    img.paste(ai_img, (image_x, image_y), mask)
                     
                 except Exception as e:
                     print(f"Error loading AI image: {e}")
         
-        # Create main drawing surface
-        draw = ImageDraw.Draw(img)
-        
-        # Todo section positioning with vertical centering
-        todo_x = self.container_padding + (image_section_width if self.use_ai_images else 0)
-        
-        # Reduce container height and center vertically using config ratio
-        vertical_padding = int(height * self.vertical_padding_ratio)
-        todo_y = vertical_padding
-        container_height = height - (vertical_padding * 2)
-        
-        # Draw main container for todos with soft overlay
-        self.draw_rounded_rectangle(
-            draw,
-            (todo_x, todo_y, todo_x + todo_section_width, todo_y + container_height),
-            self.modules['card']['border_radius'],
-            fill=(*self.colors['surface'], int(255 * self.colors['overlay_alpha']))
-        )
-        
-        # Title section
-        title_font = self.get_font('title')
+        return img
+    
+    def restore_region(self, box):
+        """Copy a box of the cached background back into the canvas"""
+        x0, y0, x1, y1 = box
+        self._canvas[y0:y1, x0:x1] = self._background[y0:y1, x0:x1]
+    
+    def blend_layer(self, canvas, layer, mask, position):
+        """Alpha blend an RGB layer into a canvas array in place through an 8-bit mask (image or array)"""
+        x, y = position
+        height = min(layer.height, canvas.shape[0] - y)
+        width = min(layer.width, canvas.shape[1] - x)
+        
+        region = canvas[y:y + height, x:x + width]
+        rgb = np.asarray(layer)[:height, :width]
+        alpha = np.asarray(mask)[:height, :width, None].astype(np.uint16)
+        
+        blended = np.multiply(rgb, alpha, dtype=np.uint16)
+        blended += region * (255 - alpha)
+        blended //= 255
+        region[:] = blended
+    
+    def panel_chrome(self, size, plan):
+        """Blank todo panel with its title and date, reused until the date changes"""
+        chrome_key = (size, plan['date_text'])
+        if chrome_key != self._panel_chrome_key:
+            self._panel_chrome = Image.new('RGB', size, self.colors['surface'])
+            self.draw_panel_header(ImageDraw.Draw(self._panel_chrome), plan)
+            self._panel_chrome_key = chrome_key
+        return self._panel_chrome
+    
+    def _panel_date_y(self):
+        """Vertical offset of the date line below the panel title"""
+        return self.modules['card']['padding'] + int(self.typography['title']['size'] * self.typography['title']['line_height'])
+    
+    def draw_panel_header(self, draw, plan):
+        """Draw the static title and date onto the todo panel"""
         title_padding = self.modules['card']['padding']
         
         # Main title with accent color
-        draw.text(
-            (todo_x + title_padding, todo_y + title_padding),
+        self.draw_text(
+            draw,
+            (title_padding, title_padding),
             "Today's Focus",
-            fill=self.colors['accent'],
-            font=title_font
+            self.colors['accent'],
+            'title'
         )
         
         # Date subtitle
-        date_y = todo_y + title_padding + int(self.typography['title']['size'] * self.typography['title']['line_height'])
-        body_font = self.get_font('body')
-        draw.text(
-            (todo_x + title_padding, date_y),
-            datetime.now().strftime("%A, %B %d, %Y"),
-            fill=self.colors['text_secondary'],
-            font=body_font
+        self.draw_text(
+            draw,
+            (title_padding, self._panel_date_y()),
+            plan['date_text'],
+            self.colors['text_secondary'],
+            'body'
         )
+    
+    def draw_panel(self, draw, plan, todo_section_width, container_height):
+        """Draw stats and task modules onto the todo panel below its header"""
+        title_padding = self.modules['card']['padding']
+        tasks = plan['tasks']
         
         # Stats section
-        completed_count = sum(1 for t in tasks if t['completed'])
+        completed_count = plan['completed_count']
         total_count = len(tasks)
         
-        stats_y = date_y + int(self.typography['body']['size'] * self.typography['body']['line_height']) + self.grid_unit * 2
+        stats_y = self._panel_date_y() + int(self.typography['body']['size'] * self.typography['body']['line_height']) + self.grid_unit * 2
         
         # Progress summary with accent
-        headline_font = self.get_font('headline')
-        draw.text(
-            (todo_x + title_padding, stats_y),
-            f"{completed_count} of {total_count} completed",
-            fill=self.colors['accent'],
-            font=headline_font
+        self.draw_text(
+            draw,
+            (title_padding, stats_y),
+            plan['stats_text'],
+            self.colors['accent'],
+            'headline'
         )
         
         # Task modules
@@ -516,17 +1216,17 @@ class TodoWallpaperGenerator:
         max_modules = self.max_visible_tasks  # Use configurable limit
         
         # Calculate available space for modules
-        available_height = todo_y + container_height - module_y - title_padding - int(self.typography['body']['size'] * 3)
+        available_height = container_height - module_y - title_padding - int(self.typography['body']['size'] * 3)
         max_possible_modules = available_height // (self.modules['card']['min_height'] + self.grid_unit * 2)
         actual_max_modules = min(max_modules, int(max_possible_modules))
         
         for i, task in enumerate(tasks[:actual_max_modules]):
-            if module_y + self.modules['card']['min_height'] > todo_y + container_height - title_padding:
+            if module_y + self.modules['card']['min_height'] > container_height - title_padding:
                 break
             
             module_height = self.create_task_module(
                 draw, task,
-                todo_x + title_padding,
+                title_padding,
                 module_y,
                 module_width,
                 completed_count,
@@ -538,69 +1238,199 @@ class TodoWallpaperGenerator:
         
         # Show remaining count if any
         if len(tasks) > visible_tasks:
-            remaining_y = todo_y + container_height - title_padding - int(self.typography['body']['size'] * 2)
-            draw.text(
-                (todo_x + title_padding, remaining_y),
+            remaining_y = container_height - title_padding - int(self.typography['body']['size'] * 2)
+            self.draw_text(
+                draw,
+                (title_padding, remaining_y),
                 f"+{len(tasks) - visible_tasks} more tasks",
-                fill=self.colors['text_secondary'],
-                font=body_font
+                self.colors['text_secondary'],
+                'body'
             )
-        
-        # Footer with timestamp
-        footer_y = todo_y + container_height - title_padding - self.typography['body']['size']
-        draw.text(
-            (todo_x + todo_section_width - title_padding - 100, footer_y),
-            f"Updated {datetime.now().strftime('%H:%M')}",
-            fill=self.colors['text_disabled'],
-            font=body_font
-        )
-        
-        # Save with high quality
-        img.save(self.wallpaper_file, quality=95, optimize=True)
+    
+    def draw_scaled_panel(self, panel, plan):
+        """Draw the panel at panel_scale and Lanczos upscale it onto the full size layer"""
+        size = (max(1, round(panel.width * self.panel_scale)), max(1, round(panel.height * self.panel_scale)))
+        with self.scaled_design(self.panel_scale):
+            small = self.panel_chrome(size, plan).copy()
+            self.draw_panel(ImageDraw.Draw(small), plan, size[0], size[1])
+        panel.paste(small.resize(panel.size, Image.Resampling.LANCZOS))
+    
+    @contextmanager
+    def scaled_design(self, scale):
+        """Temporarily scale the grid, typography and module metrics"""
+        def scaled(value):
+            return max(1, round(value * scale))
+        
+        saved = (self.grid_unit, self.typography, self.modules, self.section_spacing)
+        self.grid_unit = scaled(self.grid_unit)
+        self.section_spacing = scaled(self.section_spacing)
+        self.typography = {name: {**style, 'size': scaled(style['size'])}
+                           for name, style in self.typography.items()}
+        self.modules = {name: {key: scaled(value) if key in ('width', 'min_height', 'padding', 'border_radius') else value
+                               for key, value in module.items()}
+                        for name, module in self.modules.items()}
+        try:
+            yield
+        finally:
+            self.grid_unit, self.typography, self.modules, self.section_spacing = saved
     
     def set_wallpaper(self):
+        """Schedule the desktop wallpaper update, keeping only the latest request"""
+        with self._set_lock:
+            if self._set_timer:
+                self._set_timer.cancel()
+            self._set_timer = threading.Timer(self.set_delay, self.apply_wallpaper)
+            self._set_timer.start()
+    
+    def apply_wallpaper(self):
         """Set the generated image as desktop wallpaper"""
+        with self._set_lock:
+            self._set_timer = None
         path = str(self.wallpaper_file.absolute())
-        system = platform.system()
         
         try:
-            if system == "Windows":
-                import ctypes
-                ctypes.windll.user32.SystemParametersInfoW(20, 0, path, 0)
-            elif system == "Darwin":
-                subprocess.run(['osascript', '-e', f'tell application "Finder" to set desktop picture to POSIX file "{path}"'])
-            elif system == "Linux":
-                desktop = os.environ.get('DESKTOP_SESSION', '').lower()
-                if 'gnome' in desktop:
-                    subprocess.run(['gsettings', 'set', 'org.gnome.desktop.background', 'picture-uri', f'file://{path}'])
-                elif 'kde' in desktop:
-                    script = f'var allDesktops = desktops(); for (i=0;i<allDesktops.length;i++) {{ d = allDesktops[i]; d.wallpaperPlugin = "org.kde.image"; d.currentConfigGroup = Array("Wallpaper", "org.kde.image", "General"); d.writeConfig("Image", "file://{path}") }}'
-                    subprocess.run(['qdbus', 'org.kde.plasmashell', '/PlasmaShell', 'org.kde.PlasmaShell.evaluateScript', script])
-                else:
-                    subprocess.run(['feh', '--bg-scale', path])
+            if not self._wallpaper_setter:
+                self._wallpaper_setter = self._select_wallpaper_setter(path)
+            self._wallpaper_setter(path)
         except Exception as e:
             print(f"Error setting wallpaper: {e}\nPlease manually set {path} as your wallpaper")
     
+    def _select_wallpaper_setter(self, path):
+        """Pick the desktop backend once, preferring in-process calls over spawning tools"""
+        system = platform.system()
+        if system == "Windows":
+            import ctypes
+            # The wallpaper path never changes, so encode it once and reuse the handle
+            spi = ctypes.windll.user32.SystemParametersInfoW
+            wide_path = ctypes.c_wchar_p(path)
+            # Persist to the user profile and broadcast, otherwise the change can be reverted
+            flags = _SPIF_UPDATEINIFILE | _SPIF_SENDWININICHANGE
+            return lambda _path: spi(_SPI_SETDESKWALLPAPER, 0, wide_path, flags)
+        if system == "Darwin":
+            return self._set_wallpaper_osascript
+        
+        desktop = os.environ.get('DESKTOP_SESSION', '').lower()
+        if 'gnome' in desktop:
+            try:
+                from gi.repository import Gio
+                self._gio_settings = Gio.Settings.new('org.gnome.desktop.background')
+                return self._set_wallpaper_gio
+            except Exception:
+                return self._set_wallpaper_gsettings
+        if 'kde' in desktop:
+            try:
+                from jeepney.io.blocking import open_dbus_connection
+                self._dbus = open_dbus_connection(bus='SESSION')
+                return self._set_wallpaper_jeepney
+            except Exception:
+                return self._set_wallpaper_qdbus
+        return self._set_wallpaper_feh
+    
+    def _set_wallpaper_osascript(self, path):
+        """Set the macOS desktop picture through Finder"""
+        subprocess.run(['osascript', '-e', f'tell application "Finder" to set desktop picture to POSIX file "{path}"'])
+    
+    def _set_wallpaper_gio(self, path):
+        """Set the GNOME background in-process through GSettings"""
+        from gi.repository import Gio
+        self._gio_settings.set_string('picture-uri', f'file://{path}')
+        # Writes are asynchronous; flush them so the desktop picks up the change now
+        Gio.Settings.sync()
+    
+    def _set_wallpaper_gsettings(self, path):
+        """Set the GNOME background with the gsettings command"""
+        subprocess.run(['gsettings', 'set', 'org.gnome.desktop.background', 'picture-uri', f'file://{path}'])
+    
+    def _kde_script(self, path):
+        """Plasma shell script that sets path as the wallpaper of every desktop"""
+        return f'var allDesktops = desktops(); for (i=0;i<allDesktops.length;i++) {{ d = allDesktops[i]; d.wallpaperPlugin = "org.kde.image"; d.currentConfigGroup = Array("Wallpaper", "org.kde.image", "General"); d.writeConfig("Image", "file://{path}") }}'
+    
+    def _set_wallpaper_jeepney(self, path):
+        """Set the KDE wallpaper over the session D-Bus connection"""
+        from jeepney import DBusAddress, new_method_call
+        shell = DBusAddress('/PlasmaShell', bus_name='org.kde.plasmashell', interface='org.kde.PlasmaShell')
+        self._dbus.send_and_get_reply(new_method_call(shell, 'evaluateScript', 's', (self._kde_script(path),)))
+    
+    def _set_wallpaper_qdbus(self, path):
+        """Set the KDE wallpaper with the qdbus command"""
+        subprocess.run(['qdbus', 'org.kde.plasmashell', '/PlasmaShell', 'org.kde.PlasmaShell.evaluateScript', self._kde_script(path)])
+    
+    def _set_wallpaper_feh(self, path):
+        """Set the wallpaper with feh on other X11 desktops"""
+        subprocess.run(['feh', '--bg-scale', path])
+    
+    def wallpaper_present(self):
+        """Whether the wallpaper file exists, checked on disk only until it is first seen"""
+        if not self._wallpaper_exists:
+            self._wallpaper_exists = self.wallpaper_file.exists()
+        return self._wallpaper_exists
+    
     def update_wallpaper(self):
         """Update wallpaper if todo list has changed"""
-        tasks = self.parse_todo_file()
-        current_content = str(tasks)
-        
-        if self.use_ai_images or current_content != self.last_content or not self.wallpaper_file.exists():
+        with self._render_lock:
+            # Unchanged mtime and size means nothing to do beyond the stat call
+            try:
+                st = os.stat(self.todo_file)
+                todo_stat = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                todo_stat = None
+            
+            if todo_stat == self.last_stat and self.wallpaper_present():
+                return False
+            
+            try:
+                data = self.read_todo_data(todo_stat and todo_stat[1])
+            except OSError as e:
+                print(f"Error reading todo file: {e}")
+                return False
+            
+            todo_hash = hashlib.blake2b(data, digest_size=16).digest()
+            self.last_stat = todo_stat
+            if todo_hash == self.last_hash and self.wallpaper_present():
+                return False
+            
+            tasks = self.parse_todo_file(data)
             print(f"Updating wallpaper... ({len(tasks)} tasks)")
-            self.create_wallpaper(tasks)
-            self.set_wallpaper()
-            if not self.use_ai_images:
-                self.last_content = current_content
+            changed = self.create_wallpaper(tasks)
+            if changed:
+                self.set_wallpaper()
+            self.last_hash = todo_hash
+            self.save_state()
+            return changed
+    
+    def _is_network_path(self, path):
+        """Check if path is on a network share where native file events are unreliable"""
+        if platform.system() != "Windows":
+            return False
+        if path.startswith('\\\\'):
             return True
-        return False
+        try:
+            import ctypes
+            drive = os.path.splitdrive(path)[0] + '\\'
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+        except Exception:
+            return False
+    
+    def start_observer(self):
+        """Start a watchdog observer on the todo file's directory"""
+        # Network shares need polling, native events are unreliable there
+        watch_dir = str(self.todo_file.resolve().parent)
+        if self._is_network_path(watch_dir):
+            observer = watchdog.observers.polling.PollingObserver(timeout=2)
+        else:
+            observer = watchdog.observers.Observer()
+        
+        event_handler = TodoFileHandler(self)
+        observer.schedule(event_handler, path=watch_dir, recursive=False)
+        observer.start()
+        return observer
     
     def run(self):
         """Run the wallpaper generator with file monitoring"""
         print(f"""
 Todo Wallpaper Generator - Enhanced Design
 ==========================================
-Watching: {self.todo_file}
+Watching: {self.todo_file} ({'file events' if self.use_watchdog else f'polling every {self.poll_interval}s'})
 Output: {self.wallpaper_file}
 Resolution: {self.resolution}
 AI Images: {'Enabled' if self.use_ai_images else 'Disabled'}
@@ -609,35 +1439,58 @@ Design: Unified grid system with consistent spacing
 Press Ctrl+C to stop
 """)
         
-        self.update_wallpaper()
+        # Apply the wallpaper on startup even when the restored render is still current
+        if not self.update_wallpaper() and self.wallpaper_present():
+            self.set_wallpaper()
         
-        event_handler = TodoFileHandler(self)
-        observer = watchdog.observers.Observer()
-        observer.schedule(event_handler, path='.', recursive=False)
-        observer.start()
+        observer = self.start_observer() if self.use_watchdog else None
         
         try:
             while True:
-                time.sleep(1)
+                if observer:
+                    time.sleep(1)
+                else:
+                    # A single stat per tick, update_wallpaper returns early when unchanged
+                    time.sleep(self.poll_interval)
+                    self.update_wallpaper()
         except KeyboardInterrupt:
-            observer.stop()
             print("\nStopping wallpaper generator...")
         
-        observer.join()
+        if observer:
+            observer.stop()
+            observer.join()
 
-class TodoFileHandler(watchdog.events.FileSystemEventHandler):
+class TodoFileHandler(watchdog.events.PatternMatchingEventHandler):
     """File system event handler for todo file changes"""
     
+    debounce_delay = 0.3
+    
     def __init__(self, generator):
+        # Only events naming the todo file reach the handler methods
+        super().__init__(patterns=[f"*{os.sep}{generator.todo_file.name}", generator.todo_file.name],
+                         ignore_directories=True, case_sensitive=platform.system() != "Windows")
         self.generator = generator
-        self.last_modified = 0
+        self._timer = None
+        self._lock = threading.Lock()
     
     def on_modified(self, event):
-        if event.src_path.endswith('todo.txt'):
-            current_time = time.time()
-            if current_time - self.last_modified > 1:
-                self.generator.update_wallpaper()
-                self.last_modified = current_time
+        self._schedule_update()
+    
+    def on_created(self, event):
+        self._schedule_update()
+    
+    def on_moved(self, event):
+        # Editors that save via rename land on todo.txt as the move destination
+        self._schedule_update()
+    
+    def _schedule_update(self):
+        """Restart the quiet window so a burst of events updates the wallpaper once"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_delay, self.generator.update_wallpaper)
+            self._timer.daemon = True
+            self._timer.start()
 
 if __name__ == "__main__":
     print("Please run: python todo_app.py wallpaper")
\ No newline at end of file